@@ -46,6 +46,13 @@ class Settings(BaseSettings):
     default_model: str = Field(default="gpt-4", env="DEFAULT_MODEL")
     max_tokens: int = Field(default=2000, env="MAX_TOKENS")
     temperature: float = Field(default=0.7, env="TEMPERATURE")
+    # Only enable for models that accept response_format=json_object (e.g. gpt-4o); plain gpt-4 rejects it
+    openai_json_mode: bool = Field(default=False, env="OPENAI_JSON_MODE")
+    # Entries are float32 arrays, ~6 KB each at 1536 dims, so the default holds ~62 MB
+    embedding_cache_size: int = Field(default=10_000, env="EMBEDDING_CACHE_SIZE")
+    max_stored_thoughts: int = Field(default=10_000, env="MAX_STORED_THOUGHTS")  # pattern sets kept in memory
+    pattern_ttl: int = Field(default=86_400, env="PATTERN_TTL")  # seconds
+    max_llm_concurrency: int = Field(default=8, env="MAX_LLM_CONCURRENCY")  # in-flight LLM calls per service
     
     # Application settings
     debug: bool = Field(default=False, env="DEBUG")
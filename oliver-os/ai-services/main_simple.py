@@ -3,7 +3,7 @@ Oliver-OS AI Services - Simplified Version
 Enhanced AI-brain interface with fallback implementations
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import asyncio
@@ -171,10 +171,16 @@ async def get_agents():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/agents/spawned")
-async def get_spawned_agents():
+async def get_spawned_agents(limit: int = Query(100, ge=1), offset: int = Query(0, ge=0)):
     try:
-        spawned_agents = agent_orchestrator.get_spawned_agents()
-        return {"spawned_agents": spawned_agents, "count": len(spawned_agents)}
+        spawned_agents = agent_orchestrator.get_spawned_agents(limit, offset)
+        return {
+            "spawned_agents": spawned_agents,
+            "count": len(spawned_agents),
+            "total": agent_orchestrator.count_spawned_agents(),
+            "limit": limit,
+            "offset": offset
+        }
     except Exception as e:
         logger.error(f"Error getting spawned agents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -245,7 +251,7 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 
                 await manager.send_personal_message(json.dumps({
                     "type": "agent_spawned",
-                    "data": spawned_agent.__dict__
+                    "data": spawned_agent.to_dict()
                 }), websocket)
                 
             elif message.get("type") == "spawn_multiple_agents":
@@ -255,7 +261,7 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 
                 await manager.send_personal_message(json.dumps({
                     "type": "multiple_agents_spawned",
-                    "data": [agent.__dict__ for agent in spawned_agents],
+                    "data": [agent.to_dict() for agent in spawned_agents],
                     "count": len(spawned_agents)
                 }), websocket)
                 
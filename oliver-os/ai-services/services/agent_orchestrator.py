@@ -5,10 +5,14 @@ Integrates CodeBuff SDK for multi-agent coordination and spawning
 
 import asyncio
 import json
-from typing import Dict, List, Optional, Any
+import secrets
+import time
+from collections import OrderedDict
+from itertools import chain, islice
+from typing import Awaitable, Callable, Dict, List, Optional, Any
 from datetime import datetime
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from enum import Enum
 
 # CodeBuff SDK imports (when available)
@@ -29,7 +33,7 @@ class AgentStatus(Enum):
     FAILED = "failed"
     STOPPED = "stopped"
 
-@dataclass
+@dataclass(slots=True)
 class AgentDefinition:
     id: str
     display_name: str
@@ -39,13 +43,13 @@ class AgentDefinition:
     instructions_prompt: str
     status: AgentStatus = AgentStatus.IDLE
 
-@dataclass
+@dataclass(slots=True)
 class SpawnRequest:
     agent_type: str
     prompt: str
     metadata: Optional[Dict[str, Any]] = None
 
-@dataclass
+@dataclass(slots=True)
 class SpawnedAgent:
     id: str
     agent_type: str
@@ -55,15 +59,33 @@ class SpawnedAgent:
     metadata: Dict[str, Any]
     result: Optional[Any] = None
     error: Optional[str] = None
+    duration_ms: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow dict for serialization (no recursive copy like asdict)"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
 
 class AgentOrchestrator:
     """
     Orchestrates multiple AI agents using CodeBuff SDK principles
     """
     
-    def __init__(self):
+    def __init__(self, history_size: int = 1000):
         self.agents: Dict[str, AgentDefinition] = {}
-        self.spawned_agents: Dict[str, SpawnedAgent] = {}
+        self._agent_dicts: Dict[str, Dict[str, Any]] = {}
+        # In-flight agents; finished ones move to a bounded history so memory stays flat
+        self.active_agents: Dict[str, SpawnedAgent] = {}
+        self.agent_history: "OrderedDict[str, SpawnedAgent]" = OrderedDict()
+        self._history_size = history_size
+        # Executor per agent type, resolved once instead of walking an if/elif chain per spawn
+        self._executors: Dict[str, Callable[[SpawnedAgent], Awaitable[Dict[str, Any]]]] = {
+            "thought-processor": self._execute_thought_processor,
+            "pattern-recognizer": self._execute_pattern_recognizer,
+            "knowledge-extractor": self._execute_knowledge_extractor,
+            "collaboration-coordinator": self._execute_collaboration_coordinator,
+            "bureaucracy-disruptor": self._execute_bureaucracy_disruptor,
+            "code-generator": self._execute_code_generator,
+        }
         self.logger = logging.getLogger('AgentOrchestrator')
         
     async def initialize(self):
@@ -134,6 +156,8 @@ class AgentOrchestrator:
     async def register_agent(self, agent: AgentDefinition):
         """Register a new agent type"""
         self.agents[agent.id] = agent
+        # Definitions don't change after registration, so serialize once
+        self._agent_dicts[agent.id] = {f.name: getattr(agent, f.name) for f in fields(agent)}
         self.logger.info(f"📝 Registered agent: {agent.display_name} ({agent.id})")
     
     async def spawn_agent(self, request: SpawnRequest) -> SpawnedAgent:
@@ -142,20 +166,23 @@ class AgentOrchestrator:
             raise ValueError(f"Agent type {request.agent_type} not found")
         
         agent_def = self.agents[request.agent_type]
-        agent_id = f"{request.agent_type}-{int(datetime.now().timestamp())}-{hash(request.prompt) % 10000}"
+        now = datetime.now()
+        agent_id = f"{request.agent_type}-{int(now.timestamp())}-{secrets.token_hex(4)}"
         
         spawned_agent = SpawnedAgent(
             id=agent_id,
             agent_type=request.agent_type,
             prompt=request.prompt,
             status=AgentStatus.STARTING,
-            start_time=datetime.now(),
+            start_time=now,
             metadata=request.metadata or {}
         )
         
-        self.spawned_agents[agent_id] = spawned_agent
+        self.active_agents[agent_id] = spawned_agent
         self.logger.info(f"🚀 Spawning agent: {agent_def.display_name} ({agent_id})")
         
+        # Monotonic clock for the duration; start_time stays wall-clock for display
+        started_ns = time.monotonic_ns()
         try:
             # Execute agent logic
             result = await self._execute_agent(spawned_agent, agent_def)
@@ -170,6 +197,13 @@ class AgentOrchestrator:
             spawned_agent.error = str(e)
             self.logger.error(f"❌ Agent failed: {agent_def.display_name} ({agent_id}) - {e}")
         
+        finally:
+            spawned_agent.duration_ms = (time.monotonic_ns() - started_ns) / 1e6
+            self.active_agents.pop(agent_id, None)
+            self.agent_history[agent_id] = spawned_agent
+            if len(self.agent_history) > self._history_size:
+                self.agent_history.popitem(last=False)
+        
         return spawned_agent
     
     async def _execute_agent(self, agent: SpawnedAgent, agent_def: AgentDefinition) -> Any:
@@ -177,20 +211,11 @@ class AgentOrchestrator:
         agent.status = AgentStatus.RUNNING
         
         # Simulate agent execution based on type
-        if agent_def.id == "thought-processor":
-            return await self._execute_thought_processor(agent)
-        elif agent_def.id == "pattern-recognizer":
-            return await self._execute_pattern_recognizer(agent)
-        elif agent_def.id == "knowledge-extractor":
-            return await self._execute_knowledge_extractor(agent)
-        elif agent_def.id == "collaboration-coordinator":
-            return await self._execute_collaboration_coordinator(agent)
-        elif agent_def.id == "bureaucracy-disruptor":
-            return await self._execute_bureaucracy_disruptor(agent)
-        elif agent_def.id == "code-generator":
-            return await self._execute_code_generator(agent)
-        else:
+        executor = self._executors.get(agent_def.id)
+        if executor is None:
             raise ValueError(f"Unknown agent type: {agent_def.id}")
+        
+        return await executor(agent)
     
     async def _execute_thought_processor(self, agent: SpawnedAgent) -> Dict[str, Any]:
         """Execute thought processing logic"""
@@ -301,11 +326,19 @@ class AgentOrchestrator:
     
     def get_agents(self) -> List[Dict[str, Any]]:
         """Get all registered agent types"""
-        return [asdict(agent) for agent in self.agents.values()]
+        return list(self._agent_dicts.values())
     
-    def get_spawned_agents(self) -> List[Dict[str, Any]]:
-        """Get all spawned agent instances"""
-        return [asdict(agent) for agent in self.spawned_agents.values()]
+    def get_spawned_agents(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get spawned agent instances, in-flight first, then most recently finished"""
+        if limit <= 0:
+            return []
+        offset = max(offset, 0)
+        agents = chain(self.active_agents.values(), reversed(self.agent_history.values()))
+        return [agent.to_dict() for agent in islice(agents, offset, offset + limit)]
+    
+    def count_spawned_agents(self) -> int:
+        """Total spawned agent instances available to page through"""
+        return len(self.active_agents) + len(self.agent_history)
     
     def get_agent(self, agent_id: str) -> Optional[AgentDefinition]:
         """Get agent definition by ID"""
@@ -313,19 +346,19 @@ class AgentOrchestrator:
     
     def get_spawned_agent(self, agent_id: str) -> Optional[SpawnedAgent]:
         """Get spawned agent by ID"""
-        return self.spawned_agents.get(agent_id)
+        agent = self.active_agents.get(agent_id)
+        if agent is not None:
+            return agent
+        
+        return self.agent_history.get(agent_id)
     
     async def shutdown(self):
         """Shutdown the agent orchestrator"""
         self.logger.info("🛑 Shutting down Agent Orchestrator...")
         
-        # Stop all running agents
-        running_agents = [
-            agent for agent in self.spawned_agents.values()
-            if agent.status == AgentStatus.RUNNING
-        ]
-        
-        for agent in running_agents:
-            agent.status = AgentStatus.STOPPED
+        # Stop all running agents (only in-flight agents can still be running)
+        for agent in self.active_agents.values():
+            if agent.status == AgentStatus.RUNNING:
+                agent.status = AgentStatus.STOPPED
         
         self.logger.info("✅ Agent Orchestrator shutdown complete")
@@ -0,0 +1,12 @@
+"""
+Oliver-OS JSON helpers
+Shared JSON parsing for services that decode LLM replies
+"""
+
+# orjson parses LLM replies noticeably faster; stdlib json is the fallback
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+__all__ = ["json_loads"]
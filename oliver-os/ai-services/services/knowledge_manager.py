@@ -5,9 +5,16 @@ Advanced knowledge management with Neo4j and ChromaDB integration
 
 import asyncio
 import logging
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
-import json
+from typing import Dict, List, Optional, Any, Set, Tuple
+from collections import Counter, OrderedDict, defaultdict
+import hashlib
+import heapq
+import math
+import re
 import uuid
 
 # Database imports
@@ -20,7 +27,6 @@ except ImportError:
 
 try:
     import chromadb
-    from chromadb.config import Settings as ChromaSettings
     CHROMADB_AVAILABLE = True
 except ImportError:
     CHROMADB_AVAILABLE = False
@@ -29,14 +35,71 @@ except ImportError:
 # LangChain imports
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_anthropic import ChatAnthropic
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import HumanMessage, SystemMessage
+from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
+from langchain.schema import SystemMessage
 
 # Local imports
 from config.settings import Settings
+from services.json_utils import json_loads
 
 logger = logging.getLogger(__name__)
 
+# Graph and vector writes are coalesced into bulk flushes of up to this many thoughts
+FLUSH_MAX_ITEMS = 500
+# Seconds to wait for more thoughts before flushing a partial batch
+FLUSH_INTERVAL = 0.5
+
+# Relationship extraction only considers this many confident entities, and skips short thoughts
+RELATIONSHIP_MIN_CONFIDENCE = 0.5
+RELATIONSHIP_MAX_ENTITIES = 10
+RELATIONSHIP_MIN_CONTENT_LENGTH = 40
+
+# Upper bound on relationship hops for related-concept traversal
+MAX_RELATED_DEPTH = 4
+
+_TOKEN_RE = re.compile(r'\w+')
+_PROPER_NOUN_RE = re.compile(r'\b[A-Z][a-z]+\b')
+
+ENTITY_EXTRACTION_PROMPT = """Extract entities from the given text. Look for:
+                - People (names, roles, titles)
+                - Organizations (companies, institutions, groups)
+                - Locations (places, addresses, regions)
+                - Concepts (ideas, topics, themes)
+                - Events (activities, occurrences, happenings)
+                - Objects (things, items, products)
+                
+                Return JSON format:
+                {
+                    "entities": [
+                        {
+                            "text": "entity text",
+                            "type": "PERSON|ORGANIZATION|LOCATION|CONCEPT|EVENT|OBJECT",
+                            "confidence": 0.0-1.0,
+                            "context": "surrounding context"
+                        }
+                    ]
+                }"""
+
+RELATIONSHIP_EXTRACTION_PROMPT = """Extract relationships between the given entities in the text. Look for:
+                - Semantic relationships (is-a, part-of, related-to)
+                - Temporal relationships (before, after, during)
+                - Causal relationships (causes, results-in, influences)
+                - Spatial relationships (near, far, contains)
+                - Social relationships (works-with, manages, collaborates-with)
+                
+                Return JSON format:
+                {
+                    "relationships": [
+                        {
+                            "source": "entity1",
+                            "target": "entity2",
+                            "relationship": "relationship_type",
+                            "confidence": 0.0-1.0,
+                            "context": "supporting context"
+                        }
+                    ]
+                }"""
+
 
 class KnowledgeManager:
     """
@@ -47,6 +110,15 @@ class KnowledgeManager:
         self.settings = settings
         self.logger = logging.getLogger('KnowledgeManager')
         
+        # The Neo4j driver is synchronous; run its calls here so they don't block the event loop
+        self._io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="knowledge-io")
+        
+        # Pending graph/vector writes, drained in bulk by a background task started on first use
+        self._write_queue: asyncio.Queue = asyncio.Queue()
+        self._flush_task: Optional[asyncio.Task] = None
+        
+        self._llm_semaphore = asyncio.Semaphore(self.settings.max_llm_concurrency)
+        
         # Initialize databases
         self._initialize_databases()
         
@@ -56,6 +128,15 @@ class KnowledgeManager:
         # Knowledge storage
         self.knowledge_graph: Dict[str, Dict[str, Any]] = {}
         self.vector_store: Dict[str, List[float]] = {}
+        # Inverted index over fallback vector store content for _text_search
+        self._inverted_index: Dict[str, Set[str]] = defaultdict(set)
+        self._doc_term_freqs: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        # Content hash -> embedding, so repeated thoughts skip the embeddings API. Vectors are
+        # stored as float32 arrays (~6 KB at 1536 dims vs ~50 KB as a list of Python floats)
+        self._embedding_cache: "OrderedDict[bytes, array]" = OrderedDict()
+        self._embedding_cache_hits = 0
+        self._embedding_cache_misses = 0
         self.entities: Dict[str, Dict[str, Any]] = {}
         self.relationships: Dict[str, Dict[str, Any]] = {}
     
@@ -68,9 +149,10 @@ class KnowledgeManager:
                     self.settings.neo4j_url,
                     auth=(self.settings.neo4j_user, self.settings.neo4j_password)
                 )
+                self._ensure_neo4j_indexes()
                 self.logger.info("✅ Neo4j connection established")
             except Exception as e:
-                self.logger.error(f"❌ Neo4j connection failed: {e}")
+                self.logger.error("❌ Neo4j connection failed: %s", e)
                 self.neo4j_driver = None
         else:
             self.neo4j_driver = None
@@ -79,16 +161,18 @@ class KnowledgeManager:
         # ChromaDB connection
         if CHROMADB_AVAILABLE:
             try:
-                self.chroma_client = chromadb.Client(ChromaSettings(
+                # HTTP client against the Chroma server, so concurrent adds don't
+                # serialize on an in-process SQLite writer
+                self.chroma_client = chromadb.HttpClient(
                     host=self.settings.chroma_host,
                     port=self.settings.chroma_port
-                ))
+                )
                 self.collection = self.chroma_client.get_or_create_collection(
                     name="oliver_os_knowledge"
                 )
                 self.logger.info("✅ ChromaDB connection established")
             except Exception as e:
-                self.logger.error(f"❌ ChromaDB connection failed: {e}")
+                self.logger.error("❌ ChromaDB connection failed: %s", e)
                 self.chroma_client = None
                 self.collection = None
         else:
@@ -96,15 +180,37 @@ class KnowledgeManager:
             self.collection = None
             self.logger.warning("⚠️ ChromaDB not available, using fallback")
     
+    def _ensure_neo4j_indexes(self):
+        """Create the indexes the MERGE/MATCH lookups rely on"""
+        try:
+            with self.neo4j_driver.session() as session:
+                session.run("CREATE INDEX entity_text IF NOT EXISTS FOR (n:Entity) ON (n.text)")
+                session.run("CREATE INDEX thought_id IF NOT EXISTS FOR (n:Thought) ON (n.id)")
+        except Exception as e:
+            self.logger.warning("Neo4j index creation failed: %s", e)
+    
     def _initialize_models(self):
         """Initialize AI models for knowledge extraction"""
         self.models = {}
         
+        # Extraction prompts are fixed, so build the templates once
+        self._entity_prompt = ChatPromptTemplate.from_messages([
+            SystemMessage(content=ENTITY_EXTRACTION_PROMPT),
+            HumanMessagePromptTemplate.from_template("{content}")
+        ])
+        self._relationship_prompt = ChatPromptTemplate.from_messages([
+            SystemMessage(content=RELATIONSHIP_EXTRACTION_PROMPT),
+            HumanMessagePromptTemplate.from_template("Text: {content}\n\nEntities: {entities}")
+        ])
+        
         if self.settings.openai_api_key:
+            # JSON mode keeps replies parseable, but not every model supports it
+            model_kwargs = {"response_format": {"type": "json_object"}} if self.settings.openai_json_mode else {}
             self.models['openai'] = ChatOpenAI(
                 model=self.settings.default_model,
                 api_key=self.settings.openai_api_key,
-                temperature=0.3
+                temperature=0.3,
+                model_kwargs=model_kwargs
             )
             self.embeddings = OpenAIEmbeddings(api_key=self.settings.openai_api_key)
             self.logger.info("✅ OpenAI models initialized for knowledge management")
@@ -122,45 +228,50 @@ class KnowledgeManager:
         Search knowledge base using semantic search
         """
         try:
-            self.logger.info(f"🔍 Searching knowledge base: {query}")
+            self.logger.info("🔍 Searching knowledge base: %s", query)
             
             results = []
             
             # Vector search if ChromaDB is available
             if self.collection:
                 try:
-                    vector_results = self.collection.query(
-                        query_texts=[query],
-                        n_results=limit
+                    # The Chroma client is synchronous; keep the HTTP round trip off the event loop
+                    vector_results = await asyncio.get_running_loop().run_in_executor(
+                        self._io_pool,
+                        partial(self.collection.query, query_texts=[query], n_results=limit)
                     )
                     
-                    for i, (id, distance, metadata) in enumerate(zip(
-                        vector_results['ids'][0],
-                        vector_results['distances'][0],
-                        vector_results['metadatas'][0]
-                    )):
-                        results.append({
+                    # Chroma returns at most n_results rows, nearest first, so no re-sort is needed
+                    results = [
+                        {
                             "id": id,
                             "content": metadata.get('content', ''),
                             "type": metadata.get('type', 'unknown'),
                             "relevance_score": 1 - distance,  # Convert distance to similarity
                             "metadata": metadata
-                        })
+                        }
+                        for id, distance, metadata in zip(
+                            vector_results['ids'][0],
+                            vector_results['distances'][0],
+                            vector_results['metadatas'][0]
+                        )
+                    ]
                 except Exception as e:
-                    self.logger.warning(f"Vector search failed: {e}")
+                    self.logger.warning("Vector search failed: %s", e)
             
-            # Fallback to text search
+            # Fallback to text search, keeping only the top matches by relevance
             if not results:
-                results = await self._text_search(query, limit)
-            
-            # Sort by relevance
-            results.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+                results = heapq.nlargest(
+                    limit,
+                    await self._text_search(query, limit),
+                    key=lambda x: x.get('relevance_score', 0)
+                )
             
-            self.logger.info(f"✅ Found {len(results)} results for query: {query}")
+            self.logger.info("✅ Found %s results for query: %s", len(results), query)
             return results[:limit]
             
         except Exception as e:
-            self.logger.error(f"❌ Error searching knowledge base: {e}")
+            self.logger.error("❌ Error searching knowledge base: %s", e)
             return []
     
     async def update_graph(self, thought_id: str, thought_content: str) -> Dict[str, Any]:
@@ -168,22 +279,20 @@ class KnowledgeManager:
         Update knowledge graph with new thought
         """
         try:
-            self.logger.info(f"🔄 Updating knowledge graph for thought: {thought_id}")
+            self.logger.info("🔄 Updating knowledge graph for thought: %s", thought_id)
             
             # Extract entities and relationships
             entities = await self._extract_entities(thought_content)
             relationships = await self._extract_relationships(thought_content, entities)
             
-            # Update graph database
-            if self.neo4j_driver:
-                await self._update_neo4j_graph(thought_id, entities, relationships)
-            else:
-                await self._update_fallback_graph(thought_id, entities, relationships)
+            # Neo4j and ChromaDB writes go through the bulk flush queue
+            if self.neo4j_driver or self.collection:
+                await self._enqueue_write(thought_id, thought_content, entities, relationships)
             
-            # Update vector store
-            if self.collection:
-                await self._update_vector_store(thought_id, thought_content, entities)
-            else:
+            # Update fallback stores
+            if not self.neo4j_driver:
+                await self._update_fallback_graph(thought_id, entities, relationships)
+            if not self.collection:
                 await self._update_fallback_vector_store(thought_id, thought_content, entities)
             
             result = {
@@ -195,11 +304,11 @@ class KnowledgeManager:
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            self.logger.info(f"✅ Knowledge graph updated for {thought_id}")
+            self.logger.info("✅ Knowledge graph updated for %s", thought_id)
             return result
             
         except Exception as e:
-            self.logger.error(f"❌ Error updating knowledge graph: {e}")
+            self.logger.error("❌ Error updating knowledge graph: %s", e)
             return {
                 "thought_id": thought_id,
                 "error": str(e),
@@ -212,7 +321,7 @@ class KnowledgeManager:
         Get concepts related to a given concept
         """
         try:
-            self.logger.info(f"🔗 Getting related concepts for: {concept}")
+            self.logger.info("🔗 Getting related concepts for: %s", concept)
             
             if self.neo4j_driver:
                 return await self._get_neo4j_related_concepts(concept, depth)
@@ -220,7 +329,7 @@ class KnowledgeManager:
                 return await self._get_fallback_related_concepts(concept, depth)
                 
         except Exception as e:
-            self.logger.error(f"❌ Error getting related concepts: {e}")
+            self.logger.error("❌ Error getting related concepts: %s", e)
             return []
     
     async def _extract_entities(self, content: str) -> List[Dict[str, Any]]:
@@ -229,124 +338,268 @@ class KnowledgeManager:
             return self._fallback_entity_extraction(content)
         
         try:
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content="""Extract entities from the given text. Look for:
-                - People (names, roles, titles)
-                - Organizations (companies, institutions, groups)
-                - Locations (places, addresses, regions)
-                - Concepts (ideas, topics, themes)
-                - Events (activities, occurrences, happenings)
-                - Objects (things, items, products)
-                
-                Return JSON format:
-                {
-                    "entities": [
-                        {
-                            "text": "entity text",
-                            "type": "PERSON|ORGANIZATION|LOCATION|CONCEPT|EVENT|OBJECT",
-                            "confidence": 0.0-1.0,
-                            "context": "surrounding context"
-                        }
-                    ]
-                }"""),
-                HumanMessage(content=content)
-            ])
-            
-            model = self._get_primary_model()
-            response = await model.ainvoke(prompt.format_messages())
+            model = self.models[self._get_primary_model()]
+            async with self._llm_semaphore:
+                response = await model.ainvoke(self._entity_prompt.format_messages(content=content))
             
-            result = json.loads(response.content)
+            result = json_loads(response.content)
             return result.get("entities", [])
             
         except Exception as e:
-            self.logger.error(f"Error extracting entities: {e}")
+            self.logger.error("Error extracting entities: %s", e)
             return self._fallback_entity_extraction(content)
     
     async def _extract_relationships(self, content: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Extract relationships between entities"""
-        if not self.models or len(entities) < 2:
+        if not self.models or len(content) < RELATIONSHIP_MIN_CONTENT_LENGTH:
             return []
         
         try:
-            entity_texts = [e['text'] for e in entities]
-            
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content="""Extract relationships between the given entities in the text. Look for:
-                - Semantic relationships (is-a, part-of, related-to)
-                - Temporal relationships (before, after, during)
-                - Causal relationships (causes, results-in, influences)
-                - Spatial relationships (near, far, contains)
-                - Social relationships (works-with, manages, collaborates-with)
-                
-                Return JSON format:
-                {
-                    "relationships": [
-                        {
-                            "source": "entity1",
-                            "target": "entity2",
-                            "relationship": "relationship_type",
-                            "confidence": 0.0-1.0,
-                            "context": "supporting context"
-                        }
-                    ]
-                }"""),
-                HumanMessage(content=f"Text: {content}\n\nEntities: {', '.join(entity_texts)}")
-            ])
+            # Most confident entities first, deduplicated and capped to keep the prompt small
+            confident = sorted(
+                (
+                    (self._coerce_confidence(e.get('confidence'), 0.0), e['text'])
+                    for e in entities
+                    if isinstance(e.get('text'), str)
+                ),
+                key=lambda pair: pair[0],
+                reverse=True
+            )
+            entity_texts = list(dict.fromkeys(
+                text for confidence, text in confident if confidence >= RELATIONSHIP_MIN_CONFIDENCE
+            ))[:RELATIONSHIP_MAX_ENTITIES]
+            if len(entity_texts) < 2:
+                return []
             
-            model = self._get_primary_model()
-            response = await model.ainvoke(prompt.format_messages())
+            model = self.models[self._get_primary_model()]
+            async with self._llm_semaphore:
+                response = await model.ainvoke(self._relationship_prompt.format_messages(
+                    content=content,
+                    entities=', '.join(entity_texts)
+                ))
             
-            result = json.loads(response.content)
+            result = json_loads(response.content)
             return result.get("relationships", [])
             
         except Exception as e:
-            self.logger.error(f"Error extracting relationships: {e}")
+            self.logger.error("Error extracting relationships: %s", e)
             return []
     
-    async def _update_neo4j_graph(self, thought_id: str, entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]]):
-        """Update Neo4j graph database"""
+    async def _enqueue_write(self, thought_id: str, content: str, entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]]):
+        """Queue a thought for the next bulk Neo4j/ChromaDB flush"""
+        self._ensure_flush_task()
+        
+        # Rows are built from LLM output; validate them here so one malformed entity
+        # only loses itself, not the whole batch it gets flushed with
+        entities = self._clean_entities(thought_id, entities)
+        relationships = self._clean_relationships(thought_id, relationships)
+        
+        await self._write_queue.put((thought_id, content, entities, relationships, datetime.utcnow().isoformat()))
+    
+    @staticmethod
+    def _coerce_confidence(value: Any, default: float = 0.5) -> float:
+        """Confidence from LLM output as a float, or the default if it isn't numeric"""
         try:
-            with self.neo4j_driver.session() as session:
-                # Create thought node
-                session.run(
-                    "CREATE (t:Thought {id: $id, content: $content, timestamp: $timestamp})",
-                    id=thought_id,
-                    content="",  # Store content separately if needed
-                    timestamp=datetime.utcnow().isoformat()
-                )
-                
-                # Create entity nodes
-                for entity in entities:
-                    session.run(
-                        """
-                        MERGE (e:Entity {text: $text, type: $type})
-                        SET e.confidence = $confidence, e.context = $context
-                        CREATE (t:Thought {id: $thought_id})-[:CONTAINS]->(e)
-                        """,
-                        text=entity['text'],
-                        type=entity['type'],
-                        confidence=entity.get('confidence', 0.5),
-                        context=entity.get('context', ''),
-                        thought_id=thought_id
-                    )
-                
-                # Create relationship edges
-                for rel in relationships:
-                    session.run(
-                        """
-                        MATCH (e1:Entity {text: $source})
-                        MATCH (e2:Entity {text: $target})
-                        CREATE (e1)-[r:RELATES_TO {type: $relationship, confidence: $confidence, context: $context}]->(e2)
-                        """,
-                        source=rel['source'],
-                        target=rel['target'],
-                        relationship=rel['relationship'],
-                        confidence=rel.get('confidence', 0.5),
-                        context=rel.get('context', '')
-                    )
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+    
+    def _ensure_flush_task(self):
+        """Start the background flush task if it isn't running"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop(), name="knowledge-flush")
+    
+    def _clean_entities(self, thought_id: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop malformed extracted entities and coerce the optional fields"""
+        cleaned = []
+        for entity in entities:
+            text = entity.get('text') if isinstance(entity, dict) else None
+            entity_type = entity.get('type') if isinstance(entity, dict) else None
+            if not isinstance(text, str) or not text.strip() or not isinstance(entity_type, str):
+                self.logger.warning("Skipping malformed entity for %s: %r", thought_id, entity)
+                continue
+            
+            confidence = self._coerce_confidence(entity.get('confidence', 0.5))
+            context = entity.get('context')
+            
+            cleaned.append({
+                "text": text,
+                "type": entity_type,
+                "confidence": confidence,
+                "context": context if isinstance(context, str) else ''
+            })
+        return cleaned
+    
+    def _clean_relationships(self, thought_id: str, relationships: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop extracted relationships with missing endpoints and coerce the optional fields"""
+        cleaned = []
+        for rel in relationships:
+            fields = [rel.get(key) if isinstance(rel, dict) else None for key in ('source', 'target', 'relationship')]
+            if not all(isinstance(field, str) and field.strip() for field in fields):
+                self.logger.warning("Skipping malformed relationship for %s: %r", thought_id, rel)
+                continue
+            
+            confidence = self._coerce_confidence(rel.get('confidence', 0.5))
+            context = rel.get('context')
+            
+            source, target, relationship = (field.strip() for field in fields)
+            cleaned.append({
+                "source": source,
+                "target": target,
+                "relationship": relationship,
+                "confidence": confidence,
+                "context": context if isinstance(context, str) else ''
+            })
+        return cleaned
+    
+    async def _flush_loop(self):
+        """Drain queued writes into bulk Neo4j transactions and ChromaDB adds"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._write_queue.get()]
+            deadline = loop.time() + FLUSH_INTERVAL
+            
+            # Coalesce whatever else arrives within the window, up to the batch cap
+            while len(batch) < FLUSH_MAX_ITEMS:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                if self.neo4j_driver:
+                    await self._update_neo4j_graph_bulk(batch)
+                if self.collection:
+                    await self._update_vector_store_bulk(batch)
+            except Exception as e:
+                # A bad batch must never end the loop and strand everything queued behind it
+                self.logger.error("Error flushing %s queued thoughts: %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    async def flush(self):
+        """Wait until every queued write has been flushed"""
+        if self._flush_task is None and self._write_queue.empty():
+            return
+        
+        # Restart a dead flush task so queued writes aren't silently dropped
+        self._ensure_flush_task()
+        await self._write_queue.join()
+    
+    async def shutdown(self):
+        """Flush pending writes and release background resources"""
+        await self.flush()
+        
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        
+        self._io_pool.shutdown(wait=True)
+        
+        if self.neo4j_driver:
+            self.neo4j_driver.close()
+    
+    async def _update_neo4j_graph_bulk(self, items: List[Tuple[str, str, List[Dict[str, Any]], List[Dict[str, Any]], str]]):
+        """Update Neo4j graph database for a batch of thoughts"""
+        thought_rows = []
+        entity_rows = []
+        relationship_rows = []
+        
+        for thought_id, _, entities, relationships, timestamp in items:
+            thought_rows.append({"id": thought_id, "timestamp": timestamp})
+            
+            # The model can repeat an entity; MERGE each text only once per thought
+            seen_texts = set()
+            for entity in entities:
+                if entity['text'] in seen_texts:
+                    continue
+                seen_texts.add(entity['text'])
+                entity_rows.append({
+                    "thought_id": thought_id,
+                    "id": self._entity_id(entity),
+                    "text": entity['text'],
+                    "type": entity['type'],
+                    "confidence": entity['confidence'],
+                    "context": entity['context']
+                })
+            
+            # The model doesn't always echo entity texts verbatim; map endpoints back to
+            # the stored casing so the MATCH on Entity(text) hits
+            canonical = {text.strip().casefold(): text for text in seen_texts}
+            relationship_rows.extend(
+                {
+                    "source": canonical.get(rel['source'].casefold(), rel['source']),
+                    "target": canonical.get(rel['target'].casefold(), rel['target']),
+                    "relationship": rel['relationship'],
+                    "confidence": rel['confidence'],
+                    "context": rel['context']
+                }
+                for rel in relationships
+            )
+        
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._io_pool,
+                self._sync_neo4j_write,
+                thought_rows,
+                entity_rows,
+                relationship_rows
+            )
+            self.logger.info("✅ Flushed %s thoughts to Neo4j", len(items))
                 
         except Exception as e:
-            self.logger.error(f"Error updating Neo4j graph: {e}")
+            self.logger.error("Error updating Neo4j graph: %s", e)
+    
+    def _sync_neo4j_write(self, thought_rows: List[Dict[str, Any]], entity_rows: List[Dict[str, Any]], relationship_rows: List[Dict[str, Any]]):
+        """Blocking Neo4j write, run on the I/O pool"""
+        with self.neo4j_driver.session() as session:
+            # One transaction, one statement per node/edge kind instead of one round trip per row
+            session.execute_write(self._write_thought_graph, thought_rows, entity_rows, relationship_rows)
+    
+    @staticmethod
+    def _write_thought_graph(tx, thought_rows: List[Dict[str, Any]], entity_rows: List[Dict[str, Any]], relationship_rows: List[Dict[str, Any]]):
+        """Write thoughts with their entities and relationships inside a single transaction"""
+        # Create thought nodes (MERGE so a re-submitted thought doesn't get a twin)
+        tx.run(
+            """
+            UNWIND $rows AS row
+            MERGE (t:Thought {id: row.id})
+            ON CREATE SET t.content = '', t.timestamp = row.timestamp
+            """,
+            rows=thought_rows
+        )
+        
+        # Create entity nodes
+        if entity_rows:
+            tx.run(
+                """
+                UNWIND $rows AS row
+                MATCH (t:Thought {id: row.thought_id})
+                MERGE (e:Entity {text: row.text, type: row.type})
+                SET e.id = row.id, e.confidence = row.confidence, e.context = row.context
+                MERGE (t)-[:CONTAINS]->(e)
+                """,
+                rows=entity_rows
+            )
+        
+        # Create relationship edges (MERGE on type so re-ingesting doesn't duplicate edges)
+        if relationship_rows:
+            tx.run(
+                """
+                UNWIND $rows AS row
+                MATCH (e1:Entity {text: row.source})
+                MATCH (e2:Entity {text: row.target})
+                MERGE (e1)-[r:RELATES_TO {type: row.relationship}]->(e2)
+                SET r.confidence = row.confidence, r.context = row.context
+                """,
+                rows=relationship_rows
+            )
     
     async def _update_fallback_graph(self, thought_id: str, entities: List[Dict[str, Any]], relationships: List[Dict[str, Any]]):
         """Update fallback graph storage"""
@@ -365,30 +618,71 @@ class KnowledgeManager:
             rel_id = f"{rel['source']}_{rel['target']}_{rel['relationship']}"
             self.relationships[rel_id] = rel
     
-    async def _update_vector_store(self, thought_id: str, content: str, entities: List[Dict[str, Any]]):
-        """Update ChromaDB vector store"""
+    async def _update_vector_store_bulk(self, items: List[Tuple[str, str, List[Dict[str, Any]], List[Dict[str, Any]], str]]):
+        """Update ChromaDB vector store for a batch of thoughts"""
         try:
-            # Generate embedding
+            # Generate embeddings (one batched request for the whole window)
             if hasattr(self, 'embeddings'):
-                embedding = await self.embeddings.aembed_query(content)
+                embeddings = await self._embed_contents([content for _, content, _, _, _ in items])
             else:
                 # Fallback embedding (random vector)
-                embedding = [0.0] * 1536  # OpenAI embedding dimension
+                embeddings = [[0.0] * 1536 for _ in items]  # OpenAI embedding dimension
             
-            # Store in ChromaDB
-            self.collection.add(
-                ids=[thought_id],
-                embeddings=[embedding],
-                metadatas=[{
-                    "content": content,
-                    "type": "thought",
-                    "entities": json.dumps(entities),
-                    "timestamp": datetime.utcnow().isoformat()
-                }]
+            # Store in ChromaDB with one add (one SQLite transaction / HNSW insert batch)
+            await asyncio.get_running_loop().run_in_executor(
+                self._io_pool,
+                partial(
+                    self.collection.add,
+                    ids=[thought_id for thought_id, _, _, _, _ in items],
+                    embeddings=embeddings,
+                    metadatas=[
+                        {
+                            "content": content,
+                            "type": "thought",
+                            # Compact refs; full entity records live in the graph under the same ids
+                            "entity_ids": ",".join(sorted({self._entity_id(entity) for entity in entities})),
+                            "timestamp": timestamp
+                        }
+                        for _, content, entities, _, timestamp in items
+                    ]
+                )
             )
             
         except Exception as e:
-            self.logger.error(f"Error updating vector store: {e}")
+            self.logger.error("Error updating vector store: %s", e)
+    
+    @staticmethod
+    def _entity_id(entity: Dict[str, Any]) -> str:
+        """Stable short id for an entity, shared by the graph and vector metadata"""
+        return hashlib.blake2b(f"{entity['type']}:{entity['text']}".encode('utf-8'), digest_size=8).hexdigest()
+    
+    async def _embed_contents(self, contents: List[str]) -> List[List[float]]:
+        """Embed contents, serving repeats from the content-hash LRU"""
+        keys = [hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest() for content in contents]
+        
+        vectors: Dict[bytes, List[float]] = {}
+        missing: Dict[bytes, str] = {}
+        for key, content in zip(keys, contents):
+            cached = self._embedding_cache.get(key)
+            if cached is not None:
+                self._embedding_cache.move_to_end(key)
+                vectors[key] = cached.tolist()
+            else:
+                missing[key] = content
+        
+        self._embedding_cache_misses += len(missing)
+        self._embedding_cache_hits += len(keys) - len(missing)
+        
+        if missing:
+            new_vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            for key, vector in zip(missing, new_vectors):
+                vectors[key] = vector
+                self._embedding_cache[key] = array('f', vector)
+            
+            while len(self._embedding_cache) > self.settings.embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
+        
+        return [vectors[key] for key in keys]
     
     async def _update_fallback_vector_store(self, thought_id: str, content: str, entities: List[Dict[str, Any]]):
         """Update fallback vector store"""
@@ -398,49 +692,86 @@ class KnowledgeManager:
             "entities": entities,
             "timestamp": datetime.utcnow().isoformat()
         }
+        self._index_document(thought_id, content)
+    
+    def _index_document(self, thought_id: str, content: str):
+        """Add (or re-add) a document to the fallback inverted index"""
+        previous = self._doc_term_freqs.get(thought_id)
+        if previous:
+            for token in previous:
+                postings = self._inverted_index[token]
+                postings.discard(thought_id)
+                if not postings:
+                    del self._inverted_index[token]
+        
+        term_freqs = Counter(_TOKEN_RE.findall(content.lower()))
+        for token in term_freqs:
+            self._inverted_index[token].add(thought_id)
+        
+        self._doc_term_freqs[thought_id] = term_freqs
+        self._doc_lengths[thought_id] = sum(term_freqs.values())
     
     async def _text_search(self, query: str, limit: int) -> List[Dict[str, Any]]:
         """Fallback text search"""
         results = []
-        query_lower = query.lower()
-        
-        for thought_id, data in self.vector_store.items():
-            content = data.get('content', '').lower()
-            if query_lower in content:
-                # Simple relevance scoring
-                relevance = content.count(query_lower) / len(content.split())
-                results.append({
-                    "id": thought_id,
-                    "content": data['content'],
-                    "type": "thought",
-                    "relevance_score": relevance,
-                    "metadata": data
-                })
+        query_terms = set(_TOKEN_RE.findall(query.lower()))
+        if not query_terms:
+            return results
+        
+        # Documents containing every query term, smallest postings list first
+        postings = sorted((self._inverted_index.get(term, set()) for term in query_terms), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        if not candidates:
+            return results
+        
+        doc_count = len(self._doc_term_freqs)
+        idf = {term: math.log(1 + doc_count / len(self._inverted_index[term])) for term in query_terms}
+        
+        for thought_id in candidates:
+            term_freqs = self._doc_term_freqs[thought_id]
+            # TF-IDF relevance normalized by document length
+            relevance = sum(term_freqs[term] * idf[term] for term in query_terms) / self._doc_lengths[thought_id]
+            data = self.vector_store[thought_id]
+            results.append({
+                "id": thought_id,
+                "content": data['content'],
+                "type": "thought",
+                "relevance_score": relevance,
+                "metadata": data
+            })
         
         return results
     
     async def _get_neo4j_related_concepts(self, concept: str, depth: int) -> List[Dict[str, Any]]:
         """Get related concepts from Neo4j"""
         try:
-            with self.neo4j_driver.session() as session:
-                result = session.run(
-                    """
-                    MATCH (c:Entity {text: $concept})-[r*1..$depth]-(related:Entity)
-                    RETURN DISTINCT related.text as text, related.type as type, 
-                           count(r) as connection_strength
-                    ORDER BY connection_strength DESC
-                    LIMIT 20
-                    """,
-                    concept=concept,
-                    depth=depth
-                )
-                
-                return [dict(record) for record in result]
+            return await asyncio.get_running_loop().run_in_executor(
+                self._io_pool, self._sync_neo4j_related_concepts, concept, depth
+            )
                 
         except Exception as e:
-            self.logger.error(f"Error getting Neo4j related concepts: {e}")
+            self.logger.error("Error getting Neo4j related concepts: %s", e)
             return []
     
+    def _sync_neo4j_related_concepts(self, concept: str, depth: int) -> List[Dict[str, Any]]:
+        """Blocking Neo4j read, run on the I/O pool"""
+        # Cypher can't parameterize variable-length bounds, so inline the clamped int
+        depth = max(1, min(int(depth), MAX_RELATED_DEPTH))
+        
+        with self.neo4j_driver.session() as session:
+            result = session.run(
+                f"""
+                MATCH (c:Entity {{text: $concept}})-[r*1..{depth}]-(related:Entity)
+                RETURN DISTINCT related.text as text, related.type as type, 
+                       count(r) as connection_strength
+                ORDER BY connection_strength DESC
+                LIMIT 20
+                """,
+                concept=concept
+            )
+            
+            return [dict(record) for record in result]
+    
     async def _get_fallback_related_concepts(self, concept: str, depth: int) -> List[Dict[str, Any]]:
         """Get related concepts from fallback storage"""
         related = []
@@ -480,22 +811,16 @@ class KnowledgeManager:
     
     def _fallback_entity_extraction(self, content: str) -> List[Dict[str, Any]]:
         """Fallback entity extraction using simple patterns"""
-        entities = []
-        
-        # Simple pattern-based extraction
-        import re
-        
-        # Extract capitalized words (potential proper nouns)
-        proper_nouns = re.findall(r'\b[A-Z][a-z]+\b', content)
-        for noun in set(proper_nouns):
-            entities.append({
+        # Extract capitalized words (potential proper nouns), deduplicated in order of appearance
+        return [
+            {
                 "text": noun,
                 "type": "CONCEPT",
                 "confidence": 0.3,
                 "context": "extracted from text"
-            })
-        
-        return entities
+            }
+            for noun in dict.fromkeys(_PROPER_NOUN_RE.findall(content))
+        ]
     
     def _get_primary_model(self) -> str:
         """Get the primary model name"""
@@ -515,5 +840,10 @@ class KnowledgeManager:
             "models_available": len(self.models),
             "entities_stored": len(self.entities),
             "relationships_stored": len(self.relationships),
-            "thoughts_in_graph": len(self.knowledge_graph)
+            "thoughts_in_graph": len(self.knowledge_graph),
+            "embedding_cache": {
+                "size": len(self._embedding_cache),
+                "hits": self._embedding_cache_hits,
+                "misses": self._embedding_cache_misses
+            }
         }
@@ -5,23 +5,101 @@ Advanced pattern recognition and trend analysis using AI models
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
-import json
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Any, Tuple
 import re
-from collections import Counter, defaultdict
+import statistics
+import time
+from collections import Counter, OrderedDict, defaultdict
+import hashlib
 
 # LangChain imports
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
-from langchain.prompts import ChatPromptTemplate
 from langchain.schema import HumanMessage, SystemMessage
 
 # Local imports
 from config.settings import Settings
+from services.json_utils import json_loads
 
 logger = logging.getLogger(__name__)
 
+# AI analysis results are cached by content hash; very long thoughts bypass the cache
+AI_ANALYSIS_CACHE_SIZE = 4096
+AI_ANALYSIS_CACHE_MAX_CONTENT = 8192
+
+# Compiled once at import instead of going through the re cache on every thought
+_WORD_RE = re.compile(r'\b\w+\b')
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+_NOUN_PHRASE_RE = re.compile(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b')
+_LIST_ITEM_RE = re.compile(r'^\s*[-*•]\s+', re.MULTILINE)
+
+# Basic emotion lexicon, matched in a single pass over the text
+EMOTION_WORDS = {
+    'positive': ['happy', 'joy', 'excited', 'great', 'wonderful', 'amazing', 'love', 'like'],
+    'negative': ['sad', 'angry', 'frustrated', 'worried', 'scared', 'hate', 'dislike', 'terrible'],
+    'neutral': ['okay', 'fine', 'normal', 'regular', 'standard', 'typical']
+}
+_EMOTION_LABELS = {word: emotion for emotion, words in EMOTION_WORDS.items() for word in words}
+# Anchored at word starts so inflections ("loved", "frustrating") still match; longest
+# first so "dislike" wins over "like" instead of scoring both
+_EMOTION_WORD_RE = re.compile(
+    r'\b(?:' + '|'.join(map(re.escape, sorted(_EMOTION_LABELS, key=len, reverse=True))) + ')'
+)
+
+# One fused prompt covers the linguistic, emotional and conceptual analyses so a
+# thought costs a single LLM round trip instead of three
+COMBINED_ANALYSIS_PROMPT = """Analyze the linguistic, emotional and conceptual patterns in the given text.
+
+Linguistic - look for:
+- Writing style characteristics
+- Vocabulary complexity
+- Sentence structure patterns
+- Rhetorical devices
+- Language register (formal/informal)
+
+Emotional - look for:
+- Emotional tone and sentiment
+- Emotional intensity
+- Emotional transitions
+- Underlying emotional themes
+- Emotional triggers or patterns
+
+Conceptual - look for:
+- Main concepts and themes
+- Concept relationships
+- Abstract vs concrete concepts
+- Concept hierarchies
+- Conceptual patterns or structures
+
+Return JSON format:
+{
+    "linguistic": [
+        {
+            "type": "linguistic_feature",
+            "description": "Description of the pattern",
+            "confidence": 0.0-1.0,
+            "data": {"key": "value"}
+        }
+    ],
+    "emotional": [
+        {
+            "type": "emotional_feature",
+            "description": "Description of the emotional pattern",
+            "confidence": 0.0-1.0,
+            "data": {"emotion": "value", "intensity": 0.0-1.0}
+        }
+    ],
+    "conceptual": [
+        {
+            "type": "conceptual_feature",
+            "description": "Description of the conceptual pattern",
+            "confidence": 0.0-1.0,
+            "data": {"concept": "value", "relationships": []}
+        }
+    ]
+}"""
+
 
 class PatternRecognizer:
     """
@@ -32,12 +110,19 @@ class PatternRecognizer:
         self.settings = settings
         self.logger = logging.getLogger('PatternRecognizer')
         
+        self._llm_semaphore = asyncio.Semaphore(self.settings.max_llm_concurrency)
+        
         # Initialize AI models
         self._initialize_models()
         
         # Pattern storage
-        self.patterns: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        # thought_id -> (stored_at, pattern_count, patterns), oldest first; bounded by
+        # max_stored_thoughts and pattern_ttl so it can't grow for the life of the process
+        self.patterns: "OrderedDict[str, Tuple[float, int, Dict[str, List[Dict[str, Any]]]]]" = OrderedDict()
+        self._pattern_count = 0
         self.trends: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        # Content hash -> fused AI analysis, so repeated thoughts skip the LLM call
+        self._ai_analysis_cache: "OrderedDict[bytes, Dict[str, List[Dict[str, Any]]]]" = OrderedDict()
         
         # Pattern types
         self.pattern_types = [
@@ -51,54 +136,90 @@ class PatternRecognizer:
         ]
     
     def _initialize_models(self):
-        """Initialize AI models"""
+        """Register AI models; clients are created on first use"""
+        # Building a chat client sets up its HTTP pool and validates config, so
+        # defer it until an analysis actually needs the model
+        self._model_factories: Dict[str, Callable[[], Any]] = {}
         self.models = {}
         
         if self.settings.openai_api_key:
-            self.models['openai'] = ChatOpenAI(
-                model=self.settings.default_model,
-                api_key=self.settings.openai_api_key,
-                temperature=0.3,  # Lower temperature for more consistent pattern recognition
-                max_tokens=self.settings.max_tokens
-            )
-            self.logger.info("✅ OpenAI model initialized for pattern recognition")
+            self._model_factories['openai'] = self._create_openai_model
         
         if self.settings.anthropic_api_key:
-            self.models['anthropic'] = ChatAnthropic(
-                model="claude-3-sonnet-20240229",
-                api_key=self.settings.anthropic_api_key,
-                temperature=0.3,
-                max_tokens=self.settings.max_tokens
-            )
-            self.logger.info("✅ Anthropic model initialized for pattern recognition")
+            self._model_factories['anthropic'] = self._create_anthropic_model
+        
+        # The system prompt never changes, so build the message once
+        self._analysis_system_message = SystemMessage(content=COMBINED_ANALYSIS_PROMPT)
+        
+        # Primary model instance, resolved once on first use
+        self._primary_model = None
+    
+    def _create_openai_model(self) -> ChatOpenAI:
+        """Create the OpenAI chat model"""
+        model = ChatOpenAI(
+            model=self.settings.default_model,
+            api_key=self.settings.openai_api_key,
+            temperature=0.3,  # Lower temperature for more consistent pattern recognition
+            max_tokens=self.settings.max_tokens
+        )
+        self.logger.info("✅ OpenAI model initialized for pattern recognition")
+        return model
+    
+    def _create_anthropic_model(self) -> ChatAnthropic:
+        """Create the Anthropic chat model"""
+        model = ChatAnthropic(
+            model="claude-3-sonnet-20240229",
+            api_key=self.settings.anthropic_api_key,
+            temperature=0.3,
+            max_tokens=self.settings.max_tokens
+        )
+        self.logger.info("✅ Anthropic model initialized for pattern recognition")
+        return model
+    
+    def _get_model(self) -> Any:
+        """Get the primary model instance, creating it on first use"""
+        if self._primary_model is None:
+            name = self._get_primary_model()
+            self._primary_model = self.models[name] = self._model_factories[name]()
+        return self._primary_model
     
     async def recognize_patterns(self, thought_id: str, thought_content: str, user_id: str) -> Dict[str, Any]:
         """
         Recognize patterns in a single thought
         """
+        timestamp = datetime.now(timezone.utc).isoformat()
         try:
-            self.logger.info(f"🔍 Recognizing patterns for thought: {thought_id}")
+            self.logger.info("🔍 Recognizing patterns for thought: %s", thought_id)
+            
+            # Dispatch the fused AI analysis once; the three AI-backed analyses share its result
+            ai_analysis = asyncio.create_task(self._ai_combined_analysis(thought_content)) if self._model_factories else None
+            
+            # Lowercased once and shared by the analyses that need it
+            content_lower = thought_content.lower()
+            
+            # Extract the different types of patterns concurrently
+            pattern_names = ['linguistic', 'emotional', 'conceptual', 'structural', 'temporal']
+            analyses = await asyncio.gather(
+                self._analyze_linguistic_patterns(thought_content, content_lower, ai_analysis),
+                self._analyze_emotional_patterns(thought_content, content_lower, ai_analysis),
+                self._analyze_conceptual_patterns(thought_content, ai_analysis),
+                self._analyze_structural_patterns(thought_content),
+                self._analyze_temporal_patterns(thought_id, user_id),  # if we have historical data
+                return_exceptions=True
+            )
             
-            # Extract different types of patterns
+            # One failed analysis shouldn't take the others down with it
             patterns = {}
+            for name, analysis in zip(pattern_names, analyses):
+                if isinstance(analysis, Exception):
+                    self.logger.warning("%s pattern analysis failed: %s", name, analysis)
+                    analysis = []
+                patterns[name] = analysis
             
-            # Linguistic patterns
-            patterns['linguistic'] = await self._analyze_linguistic_patterns(thought_content)
-            
-            # Emotional patterns
-            patterns['emotional'] = await self._analyze_emotional_patterns(thought_content)
-            
-            # Conceptual patterns
-            patterns['conceptual'] = await self._analyze_conceptual_patterns(thought_content)
-            
-            # Structural patterns
-            patterns['structural'] = await self._analyze_structural_patterns(thought_content)
-            
-            # Temporal patterns (if we have historical data)
-            patterns['temporal'] = await self._analyze_temporal_patterns(thought_id, user_id)
+            pattern_count = sum(len(p) for p in patterns.values())
             
             # Store patterns
-            self.patterns[thought_id] = patterns
+            self._store_patterns(thought_id, pattern_count, patterns)
             
             # Calculate overall confidence
             confidence = self._calculate_pattern_confidence(patterns)
@@ -107,32 +228,44 @@ class PatternRecognizer:
                 "thought_id": thought_id,
                 "patterns": patterns,
                 "confidence": confidence,
-                "pattern_count": sum(len(p) for p in patterns.values()),
-                "timestamp": datetime.utcnow().isoformat()
+                "pattern_count": pattern_count,
+                "timestamp": timestamp
             }
             
-            self.logger.info(f"✅ Patterns recognized for {thought_id}: {result['pattern_count']} patterns")
+            self.logger.info("✅ Patterns recognized for %s: %s patterns", thought_id, result['pattern_count'])
             return result
             
         except Exception as e:
-            self.logger.error(f"❌ Error recognizing patterns for {thought_id}: {e}")
+            self.logger.error("❌ Error recognizing patterns for %s: %s", thought_id, e)
             return {
                 "thought_id": thought_id,
                 "patterns": {},
                 "confidence": 0.0,
                 "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": timestamp
             }
     
+    async def recognize_patterns_batch(self, thoughts: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+        """
+        Recognize patterns for many (thought_id, content, user_id) thoughts at once
+        """
+        # AI calls overlap up to settings.max_llm_concurrency; results come back in input order
+        return await asyncio.gather(*(
+            self.recognize_patterns(thought_id, content, user_id)
+            for thought_id, content, user_id in thoughts
+        ))
+    
     async def analyze_trends(self, user_id: str, time_window: int = 7) -> Dict[str, Any]:
         """
         Analyze trends across multiple thoughts for a user
         """
+        now = datetime.now(timezone.utc)
+        timestamp = now.isoformat()
         try:
-            self.logger.info(f"📈 Analyzing trends for user: {user_id}")
+            self.logger.info("📈 Analyzing trends for user: %s", user_id)
             
             # Get patterns from the last time_window days
-            cutoff_date = datetime.utcnow() - timedelta(days=time_window)
+            cutoff_date = now - timedelta(days=time_window)
             
             # This would typically query a database
             # For now, we'll analyze stored patterns
@@ -170,78 +303,73 @@ class PatternRecognizer:
                 "time_window_days": time_window,
                 "patterns_analyzed": len(user_patterns),
                 "confidence": self._calculate_trend_confidence(trends),
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": timestamp
             }
             
-            self.logger.info(f"✅ Trends analyzed for {user_id}: {len(trends)} trend categories")
+            self.logger.info("✅ Trends analyzed for %s: %s trend categories", user_id, len(trends))
             return result
             
         except Exception as e:
-            self.logger.error(f"❌ Error analyzing trends for {user_id}: {e}")
+            self.logger.error("❌ Error analyzing trends for %s: %s", user_id, e)
             return {
                 "user_id": user_id,
                 "trends": {},
                 "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": timestamp
             }
     
-    async def _analyze_linguistic_patterns(self, content: str) -> List[Dict[str, Any]]:
+    async def _analyze_linguistic_patterns(self, content: str, content_lower: str, ai_analysis: Optional[Awaitable[Dict[str, List[Dict[str, Any]]]]] = None) -> List[Dict[str, Any]]:
         """Analyze linguistic patterns in content"""
         patterns = []
         
         # Word frequency analysis
-        words = re.findall(r'\b\w+\b', content.lower())
-        word_freq = Counter(words)
-        common_words = word_freq.most_common(5)
+        words = _WORD_RE.findall(content_lower)
+        # Build the top-5 dict once; joining it yields the words in frequency order
+        common_words = dict(Counter(words).most_common(5))
         
         if common_words:
             patterns.append({
                 "type": "word_frequency",
-                "description": f"Most common words: {', '.join([w[0] for w in common_words])}",
+                "description": f"Most common words: {', '.join(common_words)}",
                 "confidence": 0.8,
-                "data": dict(common_words)
+                "data": common_words
             })
         
         # Sentence length analysis
-        sentences = re.split(r'[.!?]+', content)
+        sentences = _SENTENCE_SPLIT_RE.split(content)
         sentence_lengths = [len(s.split()) for s in sentences if s.strip()]
         
         if sentence_lengths:
-            avg_length = sum(sentence_lengths) / len(sentence_lengths)
+            avg_length = statistics.fmean(sentence_lengths)
             patterns.append({
                 "type": "sentence_length",
                 "description": f"Average sentence length: {avg_length:.1f} words",
                 "confidence": 0.7,
-                "data": {"average": avg_length, "count": len(sentence_lengths)}
+                "data": {
+                    "average": avg_length,
+                    "std": statistics.pstdev(sentence_lengths, avg_length),
+                    "count": len(sentence_lengths)
+                }
             })
         
-        # Use AI for advanced linguistic analysis
-        if self.models:
+        # Merge in the AI linguistic analysis, if one was dispatched
+        if ai_analysis is not None:
             try:
-                ai_patterns = await self._ai_linguistic_analysis(content)
-                patterns.extend(ai_patterns)
+                ai_result = await ai_analysis
+                patterns.extend(ai_result.get("linguistic", []))
             except Exception as e:
-                self.logger.warning(f"AI linguistic analysis failed: {e}")
+                self.logger.warning("AI linguistic analysis failed: %s", e)
         
         return patterns
     
-    async def _analyze_emotional_patterns(self, content: str) -> List[Dict[str, Any]]:
+    async def _analyze_emotional_patterns(self, content: str, content_lower: str, ai_analysis: Optional[Awaitable[Dict[str, List[Dict[str, Any]]]]] = None) -> List[Dict[str, Any]]:
         """Analyze emotional patterns in content"""
         patterns = []
         
         # Basic emotion word detection
-        emotion_words = {
-            'positive': ['happy', 'joy', 'excited', 'great', 'wonderful', 'amazing', 'love', 'like'],
-            'negative': ['sad', 'angry', 'frustrated', 'worried', 'scared', 'hate', 'dislike', 'terrible'],
-            'neutral': ['okay', 'fine', 'normal', 'regular', 'standard', 'typical']
-        }
-        
-        content_lower = content.lower()
-        emotion_scores = {}
-        
-        for emotion, words in emotion_words.items():
-            score = sum(1 for word in words if word in content_lower)
-            emotion_scores[emotion] = score
+        emotion_scores = dict.fromkeys(EMOTION_WORDS, 0)
+        for word in _EMOTION_WORD_RE.findall(content_lower):
+            emotion_scores[_EMOTION_LABELS[word]] += 1
         
         if any(emotion_scores.values()):
             dominant_emotion = max(emotion_scores, key=emotion_scores.get)
@@ -252,22 +380,22 @@ class PatternRecognizer:
                 "data": emotion_scores
             })
         
-        # Use AI for advanced emotional analysis
-        if self.models:
+        # Merge in the AI emotional analysis, if one was dispatched
+        if ai_analysis is not None:
             try:
-                ai_patterns = await self._ai_emotional_analysis(content)
-                patterns.extend(ai_patterns)
+                ai_result = await ai_analysis
+                patterns.extend(ai_result.get("emotional", []))
             except Exception as e:
-                self.logger.warning(f"AI emotional analysis failed: {e}")
+                self.logger.warning("AI emotional analysis failed: %s", e)
         
         return patterns
     
-    async def _analyze_conceptual_patterns(self, content: str) -> List[Dict[str, Any]]:
+    async def _analyze_conceptual_patterns(self, content: str, ai_analysis: Optional[Awaitable[Dict[str, List[Dict[str, Any]]]]] = None) -> List[Dict[str, Any]]:
         """Analyze conceptual patterns in content"""
         patterns = []
         
         # Basic concept extraction (noun phrases)
-        noun_phrases = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', content)
+        noun_phrases = _NOUN_PHRASE_RE.findall(content)
         
         if noun_phrases:
             patterns.append({
@@ -277,13 +405,13 @@ class PatternRecognizer:
                 "data": noun_phrases
             })
         
-        # Use AI for advanced conceptual analysis
-        if self.models:
+        # Merge in the AI conceptual analysis, if one was dispatched
+        if ai_analysis is not None:
             try:
-                ai_patterns = await self._ai_conceptual_analysis(content)
-                patterns.extend(ai_patterns)
+                ai_result = await ai_analysis
+                patterns.extend(ai_result.get("conceptual", []))
             except Exception as e:
-                self.logger.warning(f"AI conceptual analysis failed: {e}")
+                self.logger.warning("AI conceptual analysis failed: %s", e)
         
         return patterns
     
@@ -292,17 +420,18 @@ class PatternRecognizer:
         patterns = []
         
         # Paragraph structure
-        paragraphs = content.split('\n\n')
-        if len(paragraphs) > 1:
+        # Counted in C rather than splitting the content into a list of copies
+        paragraph_count = content.count('\n\n') + 1
+        if paragraph_count > 1:
             patterns.append({
                 "type": "paragraph_structure",
-                "description": f"Content organized in {len(paragraphs)} paragraphs",
+                "description": f"Content organized in {paragraph_count} paragraphs",
                 "confidence": 0.7,
-                "data": {"paragraph_count": len(paragraphs)}
+                "data": {"paragraph_count": paragraph_count}
             })
         
         # List structure
-        list_items = re.findall(r'^\s*[-*•]\s+', content, re.MULTILINE)
+        list_items = _LIST_ITEM_RE.findall(content)
         if list_items:
             patterns.append({
                 "type": "list_structure",
@@ -312,13 +441,13 @@ class PatternRecognizer:
             })
         
         # Question patterns
-        questions = re.findall(r'\?', content)
-        if questions:
+        question_count = content.count('?')
+        if question_count:
             patterns.append({
                 "type": "question_pattern",
-                "description": f"Contains {len(questions)} questions",
+                "description": f"Contains {question_count} questions",
                 "confidence": 0.9,
-                "data": {"question_count": len(questions)}
+                "data": {"question_count": question_count}
             })
         
         return patterns
@@ -334,122 +463,66 @@ class PatternRecognizer:
             "data": {}
         }]
     
-    async def _ai_linguistic_analysis(self, content: str) -> List[Dict[str, Any]]:
-        """Use AI for advanced linguistic analysis"""
-        if not self.models:
-            return []
+    async def _ai_combined_analysis(self, content: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Use AI for advanced linguistic, emotional and conceptual analysis in one call"""
+        if not self._model_factories:
+            return {}
+        
+        key = None
+        if len(content) <= AI_ANALYSIS_CACHE_MAX_CONTENT:
+            key = hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+            cached = self._ai_analysis_cache.get(key)
+            if cached is not None:
+                self._ai_analysis_cache.move_to_end(key)
+                return cached
         
         try:
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content="""Analyze the linguistic patterns in the given text. Look for:
-                - Writing style characteristics
-                - Vocabulary complexity
-                - Sentence structure patterns
-                - Rhetorical devices
-                - Language register (formal/informal)
-                
-                Return JSON format:
-                {
-                    "patterns": [
-                        {
-                            "type": "linguistic_feature",
-                            "description": "Description of the pattern",
-                            "confidence": 0.0-1.0,
-                            "data": {"key": "value"}
-                        }
-                    ]
-                }"""),
-                HumanMessage(content=content)
-            ])
+            messages = [self._analysis_system_message, HumanMessage(content=content)]
             
-            model = self._get_primary_model()
-            response = await model.ainvoke(prompt.format_messages())
+            model = self._get_model()
+            async with self._llm_semaphore:
+                response = await model.ainvoke(messages)
             
-            result = json.loads(response.content)
-            return result.get("patterns", [])
-            
-        except Exception as e:
-            self.logger.error(f"AI linguistic analysis error: {e}")
-            return []
-    
-    async def _ai_emotional_analysis(self, content: str) -> List[Dict[str, Any]]:
-        """Use AI for advanced emotional analysis"""
-        if not self.models:
-            return []
-        
-        try:
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content="""Analyze the emotional patterns in the given text. Look for:
-                - Emotional tone and sentiment
-                - Emotional intensity
-                - Emotional transitions
-                - Underlying emotional themes
-                - Emotional triggers or patterns
-                
-                Return JSON format:
-                {
-                    "patterns": [
-                        {
-                            "type": "emotional_feature",
-                            "description": "Description of the emotional pattern",
-                            "confidence": 0.0-1.0,
-                            "data": {"emotion": "value", "intensity": 0.0-1.0}
-                        }
-                    ]
-                }"""),
-                HumanMessage(content=content)
-            ])
+            result = json_loads(response.content)
             
-            model = self._get_primary_model()
-            response = await model.ainvoke(prompt.format_messages())
+            if key is not None:
+                self._ai_analysis_cache[key] = result
+                while len(self._ai_analysis_cache) > AI_ANALYSIS_CACHE_SIZE:
+                    self._ai_analysis_cache.popitem(last=False)
             
-            result = json.loads(response.content)
-            return result.get("patterns", [])
+            return result
             
         except Exception as e:
-            self.logger.error(f"AI emotional analysis error: {e}")
-            return []
+            self.logger.error("AI pattern analysis error: %s", e)
+            return {}
     
-    async def _ai_conceptual_analysis(self, content: str) -> List[Dict[str, Any]]:
-        """Use AI for advanced conceptual analysis"""
-        if not self.models:
-            return []
-        
-        try:
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content="""Analyze the conceptual patterns in the given text. Look for:
-                - Main concepts and themes
-                - Concept relationships
-                - Abstract vs concrete concepts
-                - Concept hierarchies
-                - Conceptual patterns or structures
-                
-                Return JSON format:
-                {
-                    "patterns": [
-                        {
-                            "type": "conceptual_feature",
-                            "description": "Description of the conceptual pattern",
-                            "confidence": 0.0-1.0,
-                            "data": {"concept": "value", "relationships": []}
-                        }
-                    ]
-                }"""),
-                HumanMessage(content=content)
-            ])
-            
-            model = self._get_primary_model()
-            response = await model.ainvoke(prompt.format_messages())
-            
-            result = json.loads(response.content)
-            return result.get("patterns", [])
-            
-        except Exception as e:
-            self.logger.error(f"AI conceptual analysis error: {e}")
-            return []
+    def _store_patterns(self, thought_id: str, pattern_count: int, patterns: Dict[str, List[Dict[str, Any]]]):
+        """Store a thought's patterns, evicting the oldest entries past the size/age bounds"""
+        now = time.monotonic()
+        
+        previous = self.patterns.pop(thought_id, None)
+        if previous is not None:
+            self._pattern_count -= previous[1]
+        self.patterns[thought_id] = (now, pattern_count, patterns)
+        self._pattern_count += pattern_count
+        self._expire_patterns(now)
+    
+    def _expire_patterns(self, now: Optional[float] = None):
+        """Drop stored pattern sets past pattern_ttl or beyond max_stored_thoughts"""
+        if now is None:
+            now = time.monotonic()
+        # Entries are kept in insertion order, so expired ones are always at the front
+        expires_before = now - self.settings.pattern_ttl
+        while self.patterns:
+            stored_at, count, _ = next(iter(self.patterns.values()))
+            if len(self.patterns) <= self.settings.max_stored_thoughts and stored_at >= expires_before:
+                break
+            self.patterns.popitem(last=False)
+            self._pattern_count -= count
     
     def _get_user_patterns(self, user_id: str, cutoff_date: datetime) -> List[Dict[str, Any]]:
         """Get patterns for a user within a time window (placeholder)"""
+        self._expire_patterns()
         # This would typically query a database
         # For now, return empty list
         return []
@@ -495,41 +568,47 @@ class PatternRecognizer:
         if not patterns:
             return 0.0
         
-        all_confidences = []
+        # Running sum/count instead of collecting the confidences into a list
+        total = 0.0
+        count = 0
         for pattern_list in patterns.values():
             for pattern in pattern_list:
                 if 'confidence' in pattern:
-                    all_confidences.append(pattern['confidence'])
+                    total += pattern['confidence']
+                    count += 1
         
-        return sum(all_confidences) / len(all_confidences) if all_confidences else 0.0
+        return total / count if count else 0.0
     
     def _calculate_trend_confidence(self, trends: Dict[str, Any]) -> float:
         """Calculate overall confidence for trends"""
         if not trends:
             return 0.0
         
-        confidences = []
+        total = 0.0
+        count = 0
         for trend in trends.values():
             if isinstance(trend, dict) and 'confidence' in trend:
-                confidences.append(trend['confidence'])
+                total += trend['confidence']
+                count += 1
         
-        return sum(confidences) / len(confidences) if confidences else 0.0
+        return total / count if count else 0.0
     
     def _get_primary_model(self) -> str:
         """Get the primary model name"""
-        if 'openai' in self.models:
+        if 'openai' in self._model_factories:
             return 'openai'
-        elif 'anthropic' in self.models:
+        elif 'anthropic' in self._model_factories:
             return 'anthropic'
         else:
             return 'fallback'
     
     async def health_check(self) -> Dict[str, Any]:
         """Health check for the pattern recognizer"""
+        self._expire_patterns()
         return {
             "status": "healthy",
-            "models_available": len(self.models),
-            "model_names": list(self.models.keys()),
-            "patterns_stored": sum(len(p) for p in self.patterns.values()),
+            "models_available": len(self._model_factories),
+            "model_names": list(self._model_factories),
+            "patterns_stored": self._pattern_count,
             "trends_analyzed": len(self.trends)
         }